@@ -1,9 +1,9 @@
 # streamlit_app.py
 # Remplace entièrement ton ancien fichier par celui-ci.
-# Requirements: streamlit, PyPDF2
+# Requirements: streamlit, PyMuPDF (ou PyPDF2 en secours)
 #
 # Fonctionnalités :
-# - multi-catégories (data/<categorie>.json)
+# - multi-catégories (data/<categorie>.json.gz)
 # - upload PDF / coller texte -> génération Cloze ou Q/A heuristique
 # - ajout / édition / suppression de cartes
 # - révision continue : cartes tirées avec pondération selon ease_factor
@@ -11,66 +11,139 @@
 # - sauvegarde automatique
 
 import streamlit as st
-import json, os, io, uuid, random, datetime, math, re
-from typing import List, Optional
+import numpy as np
+import pandas as pd
+import json, os, io, datetime, gzip, hashlib, math, re, shutil, subprocess
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+# PyMuPDF (fitz) en priorité pour l'extraction PDF : backend C, bien plus rapide
+# (module `pymupdf` depuis 1.24 ; l'ancien nom `fitz` affiche un avertissement)
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except Exception:
+        fitz = None
+except Exception:
+    fitz = None
 
-# essaye PyPDF2 (nécessaire pour l'extraction PDF)
+# PyPDF2 seulement si fitz n'est pas disponible
+PyPDF2 = None
+if fitz is None:
+    try:
+        import PyPDF2
+    except Exception:
+        PyPDF2 = None
+
+if fitz is not None:
+    PDF_BACKEND = "PyMuPDF"
+elif PyPDF2 is not None:
+    PDF_BACKEND = "PyPDF2"
+else:
+    PDF_BACKEND = None
+
+# orjson (Rust) pour lire / écrire les catégories, json standard sinon
 try:
-    import PyPDF2
+    import orjson
 except Exception:
-    PyPDF2 = None
+    orjson = None
+
+# pdftotext (poppler) si présent : plus rapide encore sur les gros PDF.
+# PDF_BACKEND=python dans l'environnement force le chemin Python ci-dessus.
+PDFTOTEXT = None
+if os.environ.get("PDF_BACKEND", "").lower() != "python":
+    PDFTOTEXT = shutil.which("pdftotext")
 
 # -------------------------
 # Configuration & paths
 # -------------------------
 DATA_FOLDER = "data"
 ROOT_LEGACY_FILE = "flashcards.json"
+# nombre de notes journalisées avant de réécrire le fichier complet de la catégorie
+GRADE_LOG_COMPACT_EVERY = 50
+# version du format écrit par save_cards : {"_schema_version": N, "cards": [...]}
+# (1 = ancienne liste brute). À incrémenter à chaque changement des champs de Card.
+CARDS_SCHEMA_VERSION = 2
+# seules les dernières entrées d'historique sont affichées : on n'en garde pas plus
+HISTORY_MAXLEN = 64
+# gzip niveau 1 : quasi gratuit en CPU, divise la taille des fichiers JSON par ~6-10
+GZIP_LEVEL = 1
+# au-delà de ce nombre de pages, pdftotext est lancé en parallèle sur des tranches
+PDF_PARALLEL_MIN_PAGES = 32
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
 # -------------------------
 # Dataclass / modèle Card
 # -------------------------
+@dataclass(slots=True)
 class Card:
-    def __init__(
-        self,
-        id: str,
-        question: str,
-        answer: str,
-        created_at: Optional[str] = None,
-        interval: int = 0,
-        repetitions: int = 0,
-        ease_factor: float = 2.5,
-        due_date: Optional[str] = None,
-        history: Optional[List[dict]] = None,
-    ):
-        self.id = id
-        self.question = question
-        self.answer = answer
-        self.created_at = created_at or datetime.date.today().isoformat()
-        self.interval = interval
-        self.repetitions = repetitions
-        self.ease_factor = ease_factor
-        self.due_date = due_date or datetime.date.today().isoformat()
-        self.history = history or []
+    id: str
+    question: str
+    answer: str
+    created_at: Optional[datetime.date] = None
+    interval: int = 0
+    repetitions: int = 0
+    ease_factor: float = 2.5
+    due_date: Optional[datetime.date] = None
+    history: Optional[List[dict]] = None
+
+    def __post_init__(self):
+        # dates ISO du JSON converties une seule fois, au chargement ;
+        # absente ou illisible : date du jour
+        today = datetime.date.today()
+        self.created_at = _parse_date(self.created_at) or today
+        self.due_date = _parse_date(self.due_date) or today
+        self.history = deque(self.history or [], maxlen=HISTORY_MAXLEN)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "question": self.question,
-            "answer": self.answer,
-            "created_at": self.created_at,
-            "interval": self.interval,
-            "repetitions": self.repetitions,
-            "ease_factor": self.ease_factor,
-            "due_date": self.due_date,
-            "history": self.history,
-        }
+        d = {name: getattr(self, name) for name in self.__slots__}
+        d["history"] = list(self.history)
+        d["created_at"] = self.created_at.isoformat()
+        d["due_date"] = self.due_date.isoformat()
+        return d
+
+def new_card_ids(n: int) -> List[str]:
+    """n identifiants hexadécimaux de 64 bits tirés d'un seul appel à os.urandom."""
+    raw = os.urandom(8 * n).hex()
+    return [raw[i:i + 16] for i in range(0, 16 * n, 16)]
+
+def new_card_id() -> str:
+    return os.urandom(8).hex()
+
+@lru_cache(maxsize=4096)
+def _parse_str_date(value: str) -> Optional[datetime.date]:
+    # beaucoup de cartes partagent la même date : un seul objet date par chaîne.
+    # Seuls les 10 premiers caractères comptent ("2025-10-08T10:00:00" -> 2025-10-08) ;
+    # une date illisible ne doit pas rendre toute la catégorie illisible
+    try:
+        return datetime.date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+def _parse_date(value) -> Optional[datetime.date]:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        return _parse_str_date(value)
+    return None
 
 # -------------------------
 # Helpers : fichiers / catégories
 # -------------------------
 def get_available_categories() -> List[str]:
-    files = [f[:-5] for f in os.listdir(DATA_FOLDER) if f.endswith(".json")]
+    files = set()
+    for f in os.listdir(DATA_FOLDER):
+        if f.endswith(".json.gz"):
+            files.add(f[:-8])
+        elif f.endswith(".json"):
+            files.add(f[:-5])
     if not files:
         # si data vide mais legacy file présent, proposer migration
         if os.path.exists(ROOT_LEGACY_FILE):
@@ -79,135 +152,478 @@ def get_available_categories() -> List[str]:
     return sorted(files)
 
 def get_storage_file(category: str) -> str:
+    return os.path.join(DATA_FOLDER, f"{category}.json.gz")
+
+def get_legacy_storage_file(category: str) -> str:
+    # ancien format non compressé, migré à la première lecture
     return os.path.join(DATA_FOLDER, f"{category}.json")
 
+def get_log_file(category: str) -> str:
+    # journal append-only des cartes notées depuis la dernière sauvegarde complète
+    return os.path.join(DATA_FOLDER, f"{category}.jsonl")
+
+def _write_gzip_atomic(file_path: str, payload: bytes):
+    """Écriture atomique : fichier temporaire compressé puis os.replace.
+
+    Une écriture interrompue ne laisse qu'un .tmp, jamais un .json.gz tronqué.
+    """
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(gzip.compress(payload, compresslevel=GZIP_LEVEL))
+    os.replace(tmp_path, file_path)
+
 def migrate_legacy_to_default():
     """Si flashcards.json existe à la racine et no categories, le migrer."""
     if os.path.exists(ROOT_LEGACY_FILE) and not get_available_categories():
         try:
             with open(ROOT_LEGACY_FILE, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            target = get_storage_file("default")
-            with open(target, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            _write_gzip_atomic(get_storage_file("default"), _json_dumps(data))
             return True
         except Exception:
             return False
     return False
 
-def load_cards(category: str) -> List[Card]:
+# orjson sérialise directement les dataclasses (Card) sans passer par to_dict ;
+# ce `default` couvre le reste (historique en deque, Card et dates pour le json standard)
+def _json_default(obj):
+    if isinstance(obj, deque):
+        return list(obj)
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    if isinstance(obj, Card):
+        return obj.to_dict()
+    raise TypeError(f"Objet non sérialisable : {type(obj).__name__}")
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    # compact pour les sauvegardes automatiques, indenté seulement pour l'export utilisateur
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=_json_default, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=_json_default).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+def _json_loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _json_line(obj) -> bytes:
+    # JSON compact sur une ligne, pour le journal .jsonl
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default) + b"\n"
+    return json.dumps(obj, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n"
+
+def _card_from_dict(c: dict, today: Optional[datetime.date] = None) -> Card:
+    # today est calculé une fois par l'appelant pour tout un fichier
+    if today is None:
+        today = datetime.date.today()
+    return Card(
+        id=c["id"] if "id" in c else new_card_id(),
+        question=c.get("question", ""),
+        answer=c.get("answer", ""),
+        created_at=c.get("created_at") or today,
+        interval=c.get("interval", 0),
+        repetitions=c.get("repetitions", 0),
+        ease_factor=c.get("ease_factor", 2.5),
+        due_date=c.get("due_date") or today,
+        history=c.get("history", []),
+    )
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _load_cards_cached(category: str, mtime_ns: int, size: int, log_mtime_ns: int, log_size: int) -> Tuple[List[Card], dict, dict]:
+    """Lecture réelle du fichier + rejeu du journal ; les stats ne servent que de clé de cache."""
+    with open(get_storage_file(category), "rb") as f:
+        data = _json_loads(gzip.decompress(f.read()))
+    today = datetime.date.today()
+    if isinstance(data, dict):
+        version, records = data.get("_schema_version", 0), data.get("cards", [])
+    else:
+        version, records = 1, data
+    if version == CARDS_SCHEMA_VERSION:
+        # écrit par save_cards dans le format courant : on fait confiance aux données
+        cards = [Card(**c) for c in records]
+    else:
+        # ancien format : normalisation / migration champ par champ
+        cards = [_card_from_dict(c, today) for c in records]
+    if log_size:
+        positions = {c.id: i for i, c in enumerate(cards)}
+        with open(get_log_file(category), "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                card = _card_from_dict(_json_loads(line), today)
+                if card.id in positions:
+                    cards[positions[card.id]] = card
+                else:
+                    positions[card.id] = len(cards)
+                    cards.append(card)
+    # index id -> carte : partage les mêmes objets que la liste (pickle conserve les références)
+    cards_by_id = {c.id: c for c in cards}
+    return cards, cards_by_id, build_card_columns(cards)
+
+def build_card_columns(cards: List[Card]) -> dict:
+    """Colonnes parallèles (SoA) pour filtrer / trier / pondérer sans boucle Python par carte."""
+    return {
+        "question_lower": pd.Series([c.question.lower() for c in cards], dtype=object),
+        # question + réponse en minuscules dans une seule chaîne : un seul test par carte
+        # (le séparateur \x00 empêche une correspondance à cheval sur les deux)
+        "search_text": pd.Series([f"{c.question}\x00{c.answer}".lower() for c in cards], dtype=object),
+        "created_at": np.array([c.created_at for c in cards], dtype="datetime64[D]"),
+        "ease_factor": np.fromiter((c.ease_factor for c in cards), dtype=float, count=len(cards)),
+        "history_len": np.fromiter((len(c.history) for c in cards), dtype=np.intp, count=len(cards)),
+        # ordres de tri complets, calculés à la demande (voir get_sort_order)
+        "sort_orders": {},
+        # poids de sélection, calculés à la demande (voir get_card_weights)
+        "weights": None,
+    }
+
+def get_sort_order(card_columns: dict, column: str) -> np.ndarray:
+    """argsort stable de toute la colonne, mémorisé jusqu'à la prochaine reconstruction des colonnes."""
+    orders = card_columns["sort_orders"]
+    if column not in orders:
+        values = card_columns[column]
+        if isinstance(values, pd.Series):
+            values = values.to_numpy()
+        orders[column] = np.argsort(values, kind="stable")
+    return orders[column]
+
+def _migrate_legacy_storage_file(category: str) -> bool:
+    """Compresse data/<categorie>.json en .json.gz (octets inchangés) et supprime l'ancien."""
+    legacy_path = get_legacy_storage_file(category)
+    if not os.path.exists(legacy_path):
+        return False
+    try:
+        with open(legacy_path, "rb") as f:
+            raw = f.read()
+        # le .json n'est supprimé qu'une fois le .json.gz complet en place
+        _write_gzip_atomic(get_storage_file(category), raw)
+        os.remove(legacy_path)
+        return True
+    except Exception as e:
+        st.error(f"Impossible de migrer {legacy_path}: {e}")
+        return False
+
+def _storage_key(category: str) -> Optional[tuple]:
+    """(mtime_ns, size) du fichier et de son journal : clé du cache de lecture."""
+    try:
+        stat = os.stat(get_storage_file(category))
+    except FileNotFoundError:
+        return None
+    try:
+        log_stat = os.stat(get_log_file(category))
+        log_key = (log_stat.st_mtime_ns, log_stat.st_size)
+    except FileNotFoundError:
+        log_key = (0, 0)
+    return (stat.st_mtime_ns, stat.st_size) + log_key
+
+def _remember_deck(category: str, deck: Tuple[List[Card], dict, dict], key: Optional[tuple] = None):
+    # paquet de travail de la session : les modifications se font directement dessus.
+    # `key` = état du fichier sur disque correspondant à ce paquet (voir _storage_key)
+    st.session_state.deck = {"category": category, "deck": deck, "key": key}
+
+def _sync_deck_key(category: str):
+    """Après une écriture de cette session : le paquet en mémoire est à jour avec le disque."""
+    session_deck = st.session_state.get("deck")
+    if session_deck is not None and session_deck["category"] == category:
+        session_deck["key"] = _storage_key(category)
+
+def load_deck(category: str) -> Tuple[List[Card], dict, dict]:
+    # une fois chargé, le paquet vit en session : un seul os.stat par rerun pour vérifier
+    # qu'aucune autre session (autre onglet) n'a modifié le fichier ou son journal
+    key = _storage_key(category)
+    session_deck = st.session_state.get("deck")
+    if session_deck and session_deck["category"] == category:
+        # modifications non encore écrites : on garde le paquet de la session
+        if session_deck["key"] == key or st.session_state.get("dirty"):
+            return session_deck["deck"]
+    # sinon, ne relit / re-parse le JSON que si le fichier ou son journal a changé
     file_path = get_storage_file(category)
-    if not os.path.exists(file_path):
-        return []
+    if key is None:
+        if not _migrate_legacy_storage_file(category):
+            return [], {}, build_card_columns([])
+        key = _storage_key(category)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        cards = []
-        for c in data:
-            card = Card(
-                id=c.get("id", str(uuid.uuid4())),
-                question=c.get("question", ""),
-                answer=c.get("answer", ""),
-                created_at=c.get("created_at", datetime.date.today().isoformat()),
-                interval=c.get("interval", 0),
-                repetitions=c.get("repetitions", 0),
-                ease_factor=c.get("ease_factor", 2.5),
-                due_date=c.get("due_date", datetime.date.today().isoformat()),
-                history=c.get("history", []),
-            )
-            cards.append(card)
-        return cards
+        deck = _load_cards_cached(category, *key)
     except Exception as e:
         st.error(f"Erreur en lisant {file_path}: {e}")
-        return []
+        return [], {}, build_card_columns([])
+    _remember_deck(category, deck, key)
+    return deck
+
+def load_cards(category: str) -> List[Card]:
+    return load_deck(category)[0]
 
-def save_cards(cards: List[Card], category: str):
+def save_cards(cards: List[Card], category: str) -> bool:
     file_path = get_storage_file(category)
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump([c.to_dict() for c in cards], f, ensure_ascii=False, indent=2)
+        payload = _json_dumps({"_schema_version": CARDS_SCHEMA_VERSION, "cards": cards})
+        # contenu identique à la dernière écriture de cette session : rien à faire
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        saved_hashes = st.session_state.setdefault("saved_hashes", {})
+        if saved_hashes.get(category) == digest and os.path.exists(file_path):
+            return True
+        _write_gzip_atomic(file_path, payload)
+        saved_hashes[category] = digest
     except Exception as e:
         st.error(f"Impossible d'écrire {file_path}: {e}")
+        return False
+    # le fichier complet contient désormais tout le journal
+    try:
+        os.remove(get_log_file(category))
+    except FileNotFoundError:
+        pass
+    _sync_deck_key(category)
+    return True
+
+def refresh_deck(cards: List[Card], category: str):
+    """Remet à jour l'index et les colonnes du paquet de travail après une modification en mémoire."""
+    session_deck = st.session_state.get("deck")
+    if session_deck is not None and session_deck["category"] != category:
+        return
+    cards_by_id = None
+    key = None
+    if session_deck is not None:
+        key = session_deck["key"]
+        session_cards, session_index, _ = session_deck["deck"]
+        # liste de travail modifiée en place par les handlers, qui tiennent l'index à jour
+        if session_cards is cards and len(session_index) == len(cards):
+            cards_by_id = session_index
+    if cards_by_id is None:
+        cards_by_id = {c.id: c for c in cards}
+    _remember_deck(category, (cards, cards_by_id, build_card_columns(cards)), key)
+
+def mark_dirty(cards: List[Card], category: str):
+    """À appeler après un ajout / une édition / une suppression : l'écriture est différée à la fin du script."""
+    refresh_deck(cards, category)
+    st.session_state.dirty = True
+
+def flush_cards():
+    """Écrit le paquet de travail seulement s'il a été modifié depuis la dernière sauvegarde."""
+    session_deck = st.session_state.get("deck")
+    if not st.session_state.get("dirty") or session_deck is None:
+        return
+    if save_cards(session_deck["deck"][0], session_deck["category"]):
+        st.session_state.dirty = False
+
+def append_card_log(card: Card, category: str):
+    """Ajoute la nouvelle version de la carte au journal (O(1), sans réécrire la catégorie)."""
+    log_path = get_log_file(category)
+    try:
+        with open(log_path, "ab") as f:
+            f.write(_json_line(card))
+    except Exception as e:
+        st.error(f"Impossible d'écrire {log_path}: {e}")
+        return
+    _sync_deck_key(category)
+
+def compact_card_log(category: str):
+    """Réintègre le journal dans le fichier JSON de la catégorie."""
+    if os.path.exists(get_log_file(category)):
+        save_cards(load_cards(category), category)
 
 # -------------------------
 # Extraction PDF / génération automatique
 # -------------------------
-def extract_text_from_pdf(file_bytes) -> str:
+def _pdftotext(file_bytes, first: Optional[int] = None, last: Optional[int] = None) -> str:
+    cmd = [PDFTOTEXT, "-q", "-enc", "UTF-8"]
+    if first is not None:
+        cmd += ["-f", str(first), "-l", str(last)]
+    result = subprocess.run(cmd + ["-", "-"], input=file_bytes, capture_output=True, check=True)
+    return result.stdout.decode("utf-8", errors="replace")
+
+def _pdftotext_parallel(file_bytes) -> str:
+    """pdftotext sur des tranches de pages, un processus par cœur."""
+    workers = min(os.cpu_count() or 1, 8)
+    pages = 0
+    if fitz is not None and workers > 1:
+        # nombre de pages seulement (lecture de la table xref, pas du contenu)
+        try:
+            with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+                pages = doc.page_count
+        except Exception:
+            pages = 0
+    if pages < PDF_PARALLEL_MIN_PAGES:
+        return _pdftotext(file_bytes)
+    step = math.ceil(pages / workers)
+    ranges = [(first, min(first + step - 1, pages)) for first in range(1, pages + 1, step)]
+    # les threads ne font qu'attendre les sous-processus : pas de contention sur le GIL.
+    # Chaque tranche se termine par un saut de page (\f), la concaténation suffit.
+    with ThreadPoolExecutor(max_workers=len(ranges)) as ex:
+        return "".join(ex.map(lambda r: _pdftotext(file_bytes, *r), ranges))
+
+def _extract_text(file_bytes) -> str:
+    if PDFTOTEXT:
+        try:
+            return _pdftotext_parallel(file_bytes)
+        except (OSError, subprocess.CalledProcessError):
+            # PDF refusé par poppler : on retombe sur fitz / PyPDF2
+            pass
+    # les pages sont écrites au fil de l'eau dans un seul tampon
+    buf = io.StringIO()
+    if fitz is not None:
+        # pages extraites dans l'ordre sur un seul thread : un document fitz
+        # n'est pas utilisable depuis plusieurs threads à la fois.
+        # texte brut uniquement : espaces conservés, ligatures décomposées (fi, fl)
+        # pour que les mots restent trouvables par la génération Cloze
+        flags = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+        with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+            for page in doc:
+                buf.write(page.get_text("text", flags=flags))
+                buf.write("\n")
+        return buf.getvalue()
     if PyPDF2 is None:
-        st.error("PyPDF2 n'est pas installé : impossible d'extraire le PDF.")
-        return ""
-    text_parts = []
+        raise RuntimeError("ni PyMuPDF ni PyPDF2 ne sont installés")
+    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+    for page in reader.pages:
+        buf.write(page.extract_text() or "")
+        buf.write("\n")
+    return buf.getvalue()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _extract_text_cached(digest: bytes, _file_bytes) -> str:
+    # `_file_bytes` n'est pas haché par Streamlit : la clé est le digest blake2b
+    return _extract_text(_file_bytes)
+
+def extract_text_from_pdf(file_bytes) -> str:
     try:
-        reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        for page in reader.pages:
-            page_text = page.extract_text() or ""
-            text_parts.append(page_text)
+        return _extract_text_cached(hashlib.blake2b(file_bytes).digest(), file_bytes)
     except Exception as e:
         st.error(f"Erreur d'extraction PDF: {e}")
-    return "\n".join(text_parts)
+        return ""
+
+# Regex compilées une seule fois (appelées pour chaque phrase du texte)
+_SENT_SPLIT_RE = re.compile(r'(?<=[.?!;])\s+')
+_WORD_RE = re.compile(r"\w+")
+
+@lru_cache(maxsize=4096)
+def _blank_pattern(blank: str):
+    return re.compile(r"\b" + re.escape(blank) + r"\b", flags=re.IGNORECASE)
 
-def split_into_sentences(text: str) -> List[str]:
-    sentences = re.split(r'(?<=[\.\?\!;])\s+', text.replace("\n", " "))
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 15]
-    return sentences
+def _is_word_char(ch: str) -> bool:
+    # même définition que \w pour les chaînes unicode
+    return ch.isalnum() or ch == "_"
+
+def _replace_first_word(sentence: str, word: str, replacement: str) -> Optional[str]:
+    """Équivalent de re.sub(r"\bword\b", ..., count=1, flags=re.I) sans regex.
+    Renvoie None si on ne peut pas conclure (la regex prend alors le relais)."""
+    haystack = sentence.lower()
+    if len(haystack) != len(sentence):
+        # certaines minuscules changent de longueur : les indices ne correspondraient plus
+        return None
+    needle = word.lower()
+    end = len(needle)
+    i = haystack.find(needle)
+    while i != -1:
+        j = i + end
+        if (i == 0 or not _is_word_char(sentence[i - 1])) and (j == len(sentence) or not _is_word_char(sentence[j])):
+            return sentence[:i] + replacement + sentence[j:]
+        i = haystack.find(needle, i + 1)
+    return None
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Parcourt le texte une seule fois et renvoie les phrases au fil de l'eau."""
+    text = text.replace("\n", " ")
+    start = 0
+    for m in _SENT_SPLIT_RE.finditer(text):
+        sentence = text[start:m.start()].strip()
+        if len(sentence) > 15:
+            yield sentence
+        start = m.end()
+    sentence = text[start:].strip()
+    if len(sentence) > 15:
+        yield sentence
 
 def generate_cloze_from_sentence(sentence: str) -> Optional[dict]:
-    words = re.findall(r"\w+", sentence)
+    words = _WORD_RE.findall(sentence)
     if not words:
         return None
-    candidates = [w for w in words if len(w) > 6]
-    if not candidates:
-        candidates = [w for w in words if len(w) > 4]
-    if not candidates:
+    # un seul comptage : le mot le plus long, puis le plus fréquent à longueur égale
+    # (à égalité, le premier apparu, au lieu de l'ordre arbitraire d'un set)
+    counts = Counter(words)
+    rank = lambda w: (len(w), counts[w])
+    blank = max((w for w in counts if len(w) > 6), key=rank, default=None)
+    if blank is None:
+        blank = max((w for w in counts if len(w) > 4), key=rank, default=None)
+    if blank is None:
         return None
-    blank = max(set(candidates), key=len)
     # Remplacer seulement la première occurrence
-    pattern = re.compile(r"\b" + re.escape(blank) + r"\b", flags=re.IGNORECASE)
-    question = pattern.sub("_____", sentence, count=1)
+    question = _replace_first_word(sentence, blank, "_____")
+    if question is None:
+        question = _blank_pattern(blank).sub("_____", sentence, count=1)
     if question == sentence:
         # fallback simple
         question = sentence.replace(blank, "_____", 1)
     return {"question": question, "answer": blank}
 
-def generate_qa_from_text_by_lines(text: str) -> List[dict]:
-    results = []
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    for i, line in enumerate(lines):
-        if ":" in line and len(line.split(":")[0]) < 100:
-            left, right = line.split(":", 1)
-            question = left.strip()
-            answer = right.strip()
-            j = i + 1
-            while j < min(i + 4, len(lines)) and not (":" in lines[j] and len(lines[j].split(":")[0]) < 100):
-                if len(lines[j]) < 200:
-                    answer += " " + lines[j]
-                j += 1
-            results.append({"question": question, "answer": answer})
-    return results
+def iter_qa_from_text_by_lines(text: str) -> Iterator[dict]:
+    """Paires "question: réponse" renvoyées au fil de la lecture des lignes.
 
-def auto_generate_cards_from_text(text: str, max_cards: int = 80, method: str = "cloze") -> List[Card]:
-    cards = []
+    Une paire est émise dès que sa réponse est complète (3 lignes de suite
+    au plus, ou nouvelle question) : l'appelant peut s'arrêter à max_cards
+    sans parcourir le reste du document.
+    """
+    question = answer = None
+    continuation = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        left, sep, right = line.partition(":")
+        if sep and len(left) < 100:
+            if question is not None:
+                yield {"question": question, "answer": answer}
+            question, answer, continuation = left.strip(), right.strip(), 0
+        elif question is not None:
+            if len(line) < 200:
+                answer += " " + line
+            continuation += 1
+            if continuation == 3:
+                yield {"question": question, "answer": answer}
+                question = None
+    if question is not None:
+        yield {"question": question, "answer": answer}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _generate_qa_pairs_cached(text: str, max_cards: int, method: str) -> List[dict]:
+    """Partie déterministe de la génération (paires question / réponse), mise en cache."""
+    pairs = []
+    # phrases répétées (diapos, en-têtes...) : une seule carte par paire
+    seen = set()
     # Try Q/A by lines first if requested
     if method == "qa":
-        qa_by_lines = generate_qa_from_text_by_lines(text)
-        for qa in qa_by_lines:
-            cards.append(Card(str(uuid.uuid4()), qa["question"], qa["answer"]))
-            if len(cards) >= max_cards:
-                return cards
+        for qa in iter_qa_from_text_by_lines(text):
+            key = (qa["question"], qa["answer"])
+            if key in seen:
+                continue
+            seen.add(key)
+            pairs.append(qa)
+            if len(pairs) >= max_cards:
+                return pairs
     # Cloze generation from sentences
-    sentences = split_into_sentences(text)
-    for s in sentences:
-        if method == "qa":
-            # if QA requested but QA_by_lines didn't find enough, fall back to cloze
-            pass
+    # (if QA requested but QA_by_lines didn't find enough, fall back to cloze)
+    for s in iter_sentences(text):
+        # pré-filtre sans regex : un mot \w+ de plus de 4 lettres est forcément
+        # dans un morceau de split() de plus de 4 caractères
+        if not any(len(w) > 4 for w in s.split()):
+            continue
         cloze = generate_cloze_from_sentence(s)
         if cloze:
-            q = cloze["question"]
-            a = cloze["answer"]
-            cards.append(Card(str(uuid.uuid4()), q, a))
-            if len(cards) >= max_cards:
+            key = (cloze["question"], cloze["answer"])
+            if key in seen:
+                continue
+            seen.add(key)
+            pairs.append(cloze)
+            if len(pairs) >= max_cards:
                 break
-    return cards
+    return pairs
+
+def auto_generate_cards_from_text(text: str, max_cards: int = 80, method: str = "cloze") -> List[Card]:
+    # les ids restent aléatoires à chaque génération, seules les paires sont mises en cache
+    pairs = _generate_qa_pairs_cached(text, max_cards, method)
+    ids = new_card_ids(len(pairs))
+    return [Card(card_id, p["question"], p["answer"]) for card_id, p in zip(ids, pairs)]
 
 # -------------------------
 # SM-2 (simplifié) + grading
@@ -233,9 +649,18 @@ def sm2_update(card: Card, quality: int):
     if ef < 1.3:
         ef = 1.3
     card.ease_factor = ef
-    card.due_date = (today + datetime.timedelta(days=card.interval)).isoformat()
+    card.due_date = today + datetime.timedelta(days=card.interval)
     card.history.append({"date": today.isoformat(), "q": q, "user_grade": quality})
 
+def persist_grade(cards: List[Card], card: Card, category: str):
+    """Journalise la note, et compacte toutes les GRADE_LOG_COMPACT_EVERY notes."""
+    append_card_log(card, category)
+    pending = st.session_state.get("pending_grades", 0) + 1
+    if pending >= GRADE_LOG_COMPACT_EVERY:
+        save_cards(cards, category)
+        pending = 0
+    st.session_state.pending_grades = pending
+
 def grade_card(card: Card, user_grade: int):
     """
     user_grade: 1 = Pas compris, 2 = Moyen, 3 = Bien
@@ -247,21 +672,46 @@ def grade_card(card: Card, user_grade: int):
 # -------------------------
 # Sélection pondérée (révision continue)
 # -------------------------
-def choose_next_card(cards: List[Card]) -> Optional[Card]:
-    if not cards:
+def card_weight(card: Card) -> float:
+    # poids = inverse de la maîtrise : plus EF bas => plus souvent
+    # on limite EF pour que poids reste positif
+    weight = max(0.1, 4.0 - card.ease_factor)
+    # on peut augmenter poids si peu d'historique
+    if len(card.history) == 0:
+        weight *= 1.2
+    return weight
+
+def compute_card_weights(columns: dict) -> np.ndarray:
+    """Même calcul que card_weight, vectorisé sur les colonnes du paquet."""
+    ease_factors = columns["ease_factor"]
+    history_lens = columns["history_len"]
+    weights = np.maximum(0.1, 4.0 - ease_factors)
+    weights[history_lens == 0] *= 1.2
+    return weights
+
+def choose_next_index(weights: np.ndarray) -> Optional[int]:
+    if len(weights) == 0:
         return None
-    weights = []
-    for c in cards:
-        # poids = inverse de la maîtrise : plus EF bas => plus souvent
-        # on limite EF pour que poids reste positif
-        # weight = max(0.2, 4.0 - c.ease_factor)
-        weight = max(0.1, 4.0 - c.ease_factor)
-        # on peut augmenter poids si peu d'historique
-        if len(c.history) == 0:
-            weight *= 1.2
-        weights.append(weight)
-    chosen = random.choices(cards, weights=weights, k=1)[0]
-    return chosen
+    return int(np.random.choice(len(weights), p=weights / weights.sum()))
+
+def get_card_weights(columns: dict) -> np.ndarray:
+    """Poids mémorisés dans les colonnes : recalculés à chaque reconstruction des colonnes."""
+    if columns["weights"] is None:
+        columns["weights"] = compute_card_weights(columns)
+    return columns["weights"]
+
+def update_graded_card(cards: List[Card], card_columns: dict, card: Card):
+    """Une note ne modifie qu'une carte : ses colonnes et son poids sont mis à jour en place."""
+    pos = st.session_state.get("current_card_pos")
+    if pos is None or pos >= len(cards) or cards[pos] is not card:
+        pos = next((i for i, c in enumerate(cards) if c is card), None)
+        if pos is None or pos >= len(card_columns["ease_factor"]):
+            return
+    card_columns["ease_factor"][pos] = card.ease_factor
+    card_columns["history_len"][pos] = len(card.history)
+    card_columns["sort_orders"].pop("ease_factor", None)
+    if card_columns["weights"] is not None:
+        card_columns["weights"][pos] = card_weight(card)
 
 # -------------------------
 # UI : Streamlit
@@ -287,16 +737,23 @@ if not categories:
 
 selected_category = st.sidebar.selectbox("Choisis une catégorie", options=categories, index=0 if categories else -1)
 
+# changement de catégorie : on écrit les modifications en attente et on compacte
+# le journal de la précédente
+previous_category = st.session_state.get("active_category")
+if previous_category and previous_category != selected_category:
+    flush_cards()
+    compact_card_log(previous_category)
+    st.session_state.pending_grades = 0
+st.session_state.active_category = selected_category
+
 with st.sidebar.expander("➕ Créer une nouvelle catégorie"):
     new_cat_name = st.text_input("Nom de la catégorie")
     if st.button("Créer la catégorie", key="create_cat"):
         if new_cat_name.strip():
-            path = get_storage_file(new_cat_name.strip())
-            if os.path.exists(path):
+            if new_cat_name.strip() in get_available_categories():
                 st.warning("Cette catégorie existe déjà.")
             else:
-                with open(path, "w", encoding="utf-8") as f:
-                    f.write("[]")
+                save_cards([], new_cat_name.strip())
                 st.success(f"Catégorie '{new_cat_name.strip()}' créée. Recharge la page.")
         else:
             st.warning("Nom invalide.")
@@ -308,27 +765,34 @@ generation_method = st.sidebar.selectbox("Méthode de génération automatique",
 max_generate = st.sidebar.number_input("Nombre max de cartes à générer", min_value=5, max_value=500, value=80, step=5)
 
 if uploaded_file:
-    bytes_data = uploaded_file.read()
-    if uploaded_file.type == "application/pdf":
-        extracted = extract_text_from_pdf(bytes_data)
-    else:
-        try:
-            extracted = bytes_data.decode("utf-8")
-        except Exception:
-            extracted = ""
     st.sidebar.success("Fichier chargé. Utilise 'Générer' pour créer les cartes.")
     if st.sidebar.button("Générer des flashcards depuis le fichier"):
         if not selected_category:
             st.sidebar.error("Choisis d'abord une catégorie.")
         else:
+            # extraction seulement au clic ; getvalue() renvoie le tampon de l'upload
+            # sans copie ni déplacement de la position de lecture
+            bytes_data = uploaded_file.getvalue()
+            if uploaded_file.type == "application/pdf":
+                extracted = extract_text_from_pdf(bytes_data)
+            else:
+                try:
+                    extracted = bytes_data.decode("utf-8")
+                except Exception:
+                    extracted = ""
             method = "cloze" if generation_method.startswith("Cloze") else "qa"
             new_cards = auto_generate_cards_from_text(extracted, max_cards=max_generate, method=method)
             cards = load_cards(selected_category)
+            # ne pas rajouter des cartes déjà présentes (génération relancée)
+            existing = {(c.question, c.answer) for c in cards}
             added = 0
             for nc in new_cards:
+                if (nc.question, nc.answer) in existing:
+                    continue
+                existing.add((nc.question, nc.answer))
                 cards.append(nc)
                 added += 1
-            save_cards(cards, selected_category)
+            mark_dirty(cards, selected_category)
             st.sidebar.success(f"{added} flashcards générées et ajoutées à '{selected_category}'.")
 
 if pasted_text:
@@ -339,11 +803,16 @@ if pasted_text:
             method = "cloze" if generation_method.startswith("Cloze") else "qa"
             new_cards = auto_generate_cards_from_text(pasted_text, max_cards=max_generate, method=method)
             cards = load_cards(selected_category)
+            # ne pas rajouter des cartes déjà présentes (génération relancée)
+            existing = {(c.question, c.answer) for c in cards}
             added = 0
             for nc in new_cards:
+                if (nc.question, nc.answer) in existing:
+                    continue
+                existing.add((nc.question, nc.answer))
                 cards.append(nc)
                 added += 1
-            save_cards(cards, selected_category)
+            mark_dirty(cards, selected_category)
             st.sidebar.success(f"{added} flashcards générées et ajoutées à '{selected_category}'.")
 
 st.sidebar.markdown("---")
@@ -352,8 +821,8 @@ if selected_category:
     cards_for_export = load_cards(selected_category)
     if st.sidebar.button("Exporter cette catégorie (JSON)"):
         st.sidebar.success("Préparation de l'export...")
-        json_str = json.dumps([c.to_dict() for c in cards_for_export], ensure_ascii=False, indent=2)
-        st.sidebar.download_button("Télécharger JSON", data=json_str, file_name=f"{selected_category}_flashcards.json", mime="application/json")
+        export_bytes = _json_dumps(cards_for_export, indent=True)
+        st.sidebar.download_button("Télécharger JSON", data=export_bytes, file_name=f"{selected_category}_flashcards.json", mime="application/json")
 
 # Import JSON file into selected category
 uploaded_json = st.sidebar.file_uploader("Importer JSON de flashcards (.json)", type=["json"], key="import_json_sidebar")
@@ -363,30 +832,22 @@ if uploaded_json and st.sidebar.button("Importer JSON maintenant"):
     else:
         try:
             data = json.load(uploaded_json)
-            imported = 0
+            if isinstance(data, dict):
+                # fichier de catégorie copié tel quel depuis data/
+                data = data.get("cards", [])
+            today = datetime.date.today()
+            # liste locale : une erreur en cours de route ne laisse rien dans le paquet de travail
+            imported = [_card_from_dict(c, today) for c in data if "question" in c and "answer" in c]
             cards = load_cards(selected_category)
-            for c in data:
-                if "question" in c and "answer" in c:
-                    card = Card(
-                        id=c.get("id", str(uuid.uuid4())),
-                        question=c["question"],
-                        answer=c["answer"],
-                        created_at=c.get("created_at", datetime.date.today().isoformat()),
-                        interval=c.get("interval", 0),
-                        repetitions=c.get("repetitions", 0),
-                        ease_factor=c.get("ease_factor", 2.5),
-                        due_date=c.get("due_date", datetime.date.today().isoformat()),
-                        history=c.get("history", []),
-                    )
-                    cards.append(card)
-                    imported += 1
-            save_cards(cards, selected_category)
-            st.sidebar.success(f"{imported} cartes importées dans '{selected_category}'.")
+            cards.extend(imported)
+            mark_dirty(cards, selected_category)
+            st.sidebar.success(f"{len(imported)} cartes importées dans '{selected_category}'.")
         except Exception as e:
             st.sidebar.error(f"Erreur lors de l'import: {e}")
 
 st.sidebar.markdown("---")
 st.sidebar.caption("Les fichiers de chaque catégorie sont stockés dans le dossier 'data/'.")
+st.sidebar.caption(f"Moteur d'extraction PDF : {'pdftotext' if PDFTOTEXT else (PDF_BACKEND or 'aucun')}")
 
 # -------------------------
 # Main tabs
@@ -394,9 +855,64 @@ st.sidebar.caption("Les fichiers de chaque catégorie sont stockés dans le doss
 tab1, tab2, tab3 = st.tabs(["Réviser", "Toutes les cartes", "Ajouter / Éditer"])
 
 # Load current cards
-cards = load_cards(selected_category) if selected_category else []
+cards, cards_by_id, card_columns = load_deck(selected_category) if selected_category else ([], {}, build_card_columns([]))
 
 # --- Tab: Réviser ---
+# les boutons passent par des callbacks : ils s'exécutent avant la relance du
+# fragment, sans st.rerun() supplémentaire
+def _reveal_answer():
+    st.session_state.show_answer = True
+
+def _grade_current(cards: List[Card], card_columns: dict, card: Card, category: str, user_grade: int):
+    grade_card(card, user_grade)
+    update_graded_card(cards, card_columns, card)
+    persist_grade(cards, card, category)
+    # préparer la prochaine carte
+    st.session_state.current_card_id = None
+    st.session_state.show_answer = False
+
+@st.fragment
+def _review_fragment(cards: List[Card], cards_by_id: dict, card_columns: dict, category: str):
+    """Zone de révision : un clic (réponse / note) ne relance que ce fragment,
+    pas le chargement des cartes ni les autres onglets."""
+    # session management: conserver la carte courante jusqu'au grade
+    if "current_card_id" not in st.session_state:
+        st.session_state.current_card_id = None
+    if "show_answer" not in st.session_state:
+        st.session_state.show_answer = False
+
+    # choix ou réutilisation de la carte courante
+    current_card = None
+    if st.session_state.current_card_id:
+        current_card = cards_by_id.get(st.session_state.current_card_id)
+    if current_card is None:
+        pos = choose_next_index(get_card_weights(card_columns))
+        if pos is not None:
+            current_card = cards[pos]
+            st.session_state.current_card_id = current_card.id
+            st.session_state.current_card_pos = pos
+            st.session_state.show_answer = False
+
+    if current_card:
+        st.subheader(f"Catégorie : {category} — cartes : {len(cards)}")
+        st.markdown(f"### ❓ {current_card.question}")
+
+        if not st.session_state.show_answer:
+            st.button("👀 Montrer la réponse", on_click=_reveal_answer)
+        else:
+            st.info(current_card.answer)
+            st.markdown("**Évalue ta compréhension :**")
+            col1, col2, col3 = st.columns(3)
+            col1.button("❌ Pas compris", on_click=_grade_current, args=(cards, card_columns, current_card, category, 1))
+            col2.button("😐 Moyen", on_click=_grade_current, args=(cards, card_columns, current_card, category, 2))
+            col3.button("✅ Compris", on_click=_grade_current, args=(cards, card_columns, current_card, category, 3))
+
+            st.markdown("---")
+            st.write(f"**Historique (dernier 6):**")
+            for h in list(current_card.history)[-6:]:
+                st.write(f"- {h.get('date','?')} → SM2={h.get('q','?')}, note_utilisateur={h.get('user_grade','?')}")
+            st.write(f"EF: {current_card.ease_factor:.2f} | Répétitions: {current_card.repetitions} | Interval: {current_card.interval} jours")
+
 with tab1:
     st.header("Révision")
     if not selected_category:
@@ -405,59 +921,7 @@ with tab1:
         if not cards:
             st.info("Aucune carte dans cette catégorie. Ajoute des cartes ou génère-en depuis un PDF.")
         else:
-            # session management: conserver la carte courante jusqu'au grade
-            if "current_card_id" not in st.session_state:
-                st.session_state.current_card_id = None
-            if "show_answer" not in st.session_state:
-                st.session_state.show_answer = False
-
-            # choix ou réutilisation de la carte courante
-            current_card = None
-            if st.session_state.current_card_id:
-                current_card = next((c for c in cards if c.id == st.session_state.current_card_id), None)
-            if current_card is None:
-                current_card = choose_next_card(cards)
-                if current_card:
-                    st.session_state.current_card_id = current_card.id
-                    st.session_state.show_answer = False
-
-            if current_card:
-                st.subheader(f"Catégorie : {selected_category} — cartes : {len(cards)}")
-                st.markdown(f"### ❓ {current_card.question}")
-
-                if not st.session_state.show_answer:
-                    if st.button("👀 Montrer la réponse"):
-                        st.session_state.show_answer = True
-                        st.rerun()
-                else:
-                    st.info(current_card.answer)
-                    st.markdown("**Évalue ta compréhension :**")
-                    col1, col2, col3 = st.columns(3)
-                    if col1.button("❌ Pas compris"):
-                        grade_card(current_card, 1)
-                        save_cards(cards, selected_category)
-                        # préparer la prochaine carte
-                        st.session_state.current_card_id = None
-                        st.session_state.show_answer = False
-                        st.rerun()
-                    if col2.button("😐 Moyen"):
-                        grade_card(current_card, 2)
-                        save_cards(cards, selected_category)
-                        st.session_state.current_card_id = None
-                        st.session_state.show_answer = False
-                        st.rerun()
-                    if col3.button("✅ Compris"):
-                        grade_card(current_card, 3)
-                        save_cards(cards, selected_category)
-                        st.session_state.current_card_id = None
-                        st.session_state.show_answer = False
-                        st.rerun()
-
-                    st.markdown("---")
-                    st.write(f"**Historique (dernier 6):**")
-                    for h in current_card.history[-6:]:
-                        st.write(f"- {h.get('date','?')} → SM2={h.get('q','?')}, note_utilisateur={h.get('user_grade','?')}")
-                    st.write(f"EF: {current_card.ease_factor:.2f} | Répétitions: {current_card.repetitions} | Interval: {current_card.interval} jours")
+            _review_fragment(cards, cards_by_id, card_columns, selected_category)
 
 # --- Tab: Toutes les cartes ---
 with tab2:
@@ -468,38 +932,43 @@ with tab2:
         st.write(f"Catégorie : **{selected_category}** — total cartes : {len(cards)}")
         q = st.text_input("Chercher (question / réponse)")
         view_mode = st.selectbox("Trier par", ["Question", "Création", "Ease factor"])
-        filtered = cards
-        if q:
-            filtered = [c for c in cards if q.lower() in c.question.lower() or q.lower() in c.answer.lower()]
+        # ordre de tri mémorisé, puis filtre appliqué dessus (l'ordre est conservé)
         if view_mode == "Question":
-            filtered.sort(key=lambda x: x.question.lower())
+            order = get_sort_order(card_columns, "question_lower")
         elif view_mode == "Création":
-            filtered.sort(key=lambda x: x.created_at)
+            order = get_sort_order(card_columns, "created_at")
         else:
-            filtered.sort(key=lambda x: x.ease_factor)
+            order = get_sort_order(card_columns, "ease_factor")
+        if q:
+            mask = card_columns["search_text"].str.contains(q.lower(), regex=False).to_numpy(dtype=bool)
+            order = order[mask[order]]
 
-        for c in filtered:
+        for pos in order:
+            c = cards[pos]
             with st.expander(f"{c.question[:80]}"):
                 st.write("**Réponse :**")
                 st.write(c.answer)
                 st.write(f"ID: {c.id}")
                 st.write(f"EF: {c.ease_factor:.2f} | Rép: {c.repetitions} | Interval: {c.interval} j | Due: {c.due_date}")
-                st.write("Historique:", c.history[-5:])
+                st.write("Historique:", list(c.history)[-5:])
                 col1, col2, col3 = st.columns([1,1,1])
                 if col1.button("Éditer", key=f"edit_{c.id}"):
                     st.session_state.edit_id = c.id
-                    st.experimental_rerun()
+                    st.rerun()
                 if col2.button("Dupliquer", key=f"dup_{c.id}"):
-                    newc = Card(str(uuid.uuid4()), c.question, c.answer)
+                    newc = Card(new_card_id(), c.question, c.answer)
                     cards.append(newc)
-                    save_cards(cards, selected_category)
+                    cards_by_id[newc.id] = newc
+                    mark_dirty(cards, selected_category)
                     st.success("Carte dupliquée.")
-                    st.experimental_rerun()
+                    st.rerun()
                 if col3.button("Supprimer", key=f"del_{c.id}"):
-                    cards = [cc for cc in cards if cc.id != c.id]
-                    save_cards(cards, selected_category)
+                    # suppression en place par position : la liste de session et son index restent partagés
+                    del cards[pos]
+                    cards_by_id.pop(c.id, None)
+                    mark_dirty(cards, selected_category)
                     st.success("Carte supprimée.")
-                    st.experimental_rerun()
+                    st.rerun()
 
 # --- Tab: Ajouter / Éditer ---
 with tab3:
@@ -513,36 +982,41 @@ with tab3:
             if not new_q.strip() or not new_a.strip():
                 st.error("Question et réponse ne doivent pas être vides.")
             else:
-                nc = Card(str(uuid.uuid4()), new_q.strip(), new_a.strip())
+                nc = Card(new_card_id(), new_q.strip(), new_a.strip())
                 cards.append(nc)
-                save_cards(cards, selected_category)
+                cards_by_id[nc.id] = nc
+                mark_dirty(cards, selected_category)
                 st.success("Carte ajoutée.")
-                st.experimental_rerun()
+                st.rerun()
 
         # Edition d'une carte sélectionnée via session state
         edit_id = st.session_state.get("edit_id", None)
         if edit_id:
-            card_to_edit = next((c for c in cards if c.id == edit_id), None)
+            card_to_edit = cards_by_id.get(edit_id)
             if card_to_edit:
                 st.markdown("---")
                 st.header("Édition de la carte")
                 eq = st.text_area("Question (édition)", value=card_to_edit.question, key=f"eq_{card_to_edit.id}")
                 ea = st.text_area("Réponse (édition)", value=card_to_edit.answer, key=f"ea_{card_to_edit.id}")
-                edue = st.date_input("Date de prochaine révision (optionnel)", value=datetime.date.fromisoformat(card_to_edit.due_date) if card_to_edit.due_date else datetime.date.today(), key=f"edue_{card_to_edit.id}")
+                edue = st.date_input("Date de prochaine révision (optionnel)", value=card_to_edit.due_date, key=f"edue_{card_to_edit.id}")
                 if st.button("Enregistrer modifications"):
                     card_to_edit.question = eq
                     card_to_edit.answer = ea
-                    card_to_edit.due_date = edue.isoformat()
-                    save_cards(cards, selected_category)
+                    card_to_edit.due_date = edue
+                    mark_dirty(cards, selected_category)
                     st.success("Modifications enregistrées.")
                     st.session_state.edit_id = None
-                    st.experimental_rerun()
+                    st.rerun()
                 if st.button("Annuler édition"):
                     st.session_state.edit_id = None
-                    st.experimental_rerun()
+                    st.rerun()
             else:
                 st.warning("Carte introuvable pour l'édition.")
                 st.session_state.edit_id = None
 
 st.markdown("---")
 st.caption("Les heuristiques de génération automatique sont simples — relis/édite les cartes générées. Pour une génération plus avancée (IA), on peut intégrer un modèle externe plus tard.")
+
+# sauvegarde unique en fin de script, seulement si une modification a eu lieu
+# (après un st.rerun(), c'est la relance suivante qui l'effectue)
+flush_cards()